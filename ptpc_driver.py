@@ -1,13 +1,17 @@
 import serial
 import time
 import math
+import numpy as np
 from PIL import Image
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 PORT_NAME = '/dev/cu.usbserial-FTEFZBD9'
 
 # --- Configuration ---
 COM_PORT = PORT_NAME
+# Must match the printer's serial port setting (9600 by default). Raise it
+# (e.g. 115200) only if the printer is configured for that speed.
 BAUD_RATE = 9600
 BAND_HEIGHT = 24       # Printer fixed band height
 # The printable area for 24mm tape is effectively 120 dots (5 bands)
@@ -15,19 +19,19 @@ SAFE_PRINT_HEIGHT = 120
 
 IMG_PATH = sys.argv[1]
 
-def safe_send(ser, data, chunk_size=32):
-    """Spoon-feed data to respect the printer's small buffer"""
-    total_len = len(data)
-    for i in range(0, total_len, chunk_size):
-        chunk = data[i:i+chunk_size]
-        ser.write(chunk)
-        ser.flush() 
-        time.sleep(0.02) 
+def safe_send(ser, data, chunk_size=400):
+    """Spoon-feed data to respect the printer's 512 byte RX buffer"""
+    for i in range(0, len(data), chunk_size):
+        ser.write(data[i:i+chunk_size])
+        # Wait for the UART to drain rather than sleeping blindly,
+        # XON/XOFF throttles us if the printer's buffer fills up
+        while ser.out_waiting > 256:
+            time.sleep(0.005)
 
-def check_status(ser, step_name):
+def check_status(ser, step_name, delay=0.2):
     ser.reset_input_buffer()
     ser.write(b'\x1B\x69\x53')
-    time.sleep(0.2)
+    time.sleep(delay)
     response = ser.read(32)
 
     if len(response) != 32:
@@ -48,6 +52,30 @@ def wait_for_printer_ready(ser, step_name="Waiting"):
         time.sleep(0.5)
     return False
 
+def wait_for_rx_buffer(ser, step_name="Sending"):
+    # Byte 9 bit 1 is set while the printer's RX buffer is full, any other
+    # error bit is fatal. No settle delay needed, ser.read() blocks until
+    # the reply arrives.
+    for _ in range(5):
+        if ser.in_waiting:
+            # The printer sent a status block on its own, read it out
+            # before check_status() resets the input buffer and drops it
+            response = ser.read(32)
+            if len(response) != 32:
+                response = None
+            elif response[8] != 0 or response[9] != 0:
+                print(f"Status Error [{step_name}]: Byte8={response[8]}, Byte9={response[9]}")
+        else:
+            response = check_status(ser, step_name, delay=0)
+
+        if response is not None:
+            if response[8] != 0 or response[9] & ~2:
+                return False
+            if not response[9] & 2:
+                return True
+        time.sleep(0.1)
+    return False
+
 def load_bitmap_to_canvas(path):
     # Load image and convert to 1-bit monochrome
     img = Image.open(path).convert("1")
@@ -59,40 +87,47 @@ def load_bitmap_to_canvas(path):
         aspect_ratio = width / height
         new_width = int(SAFE_PRINT_HEIGHT * aspect_ratio)
         print(f"Resizing: {width}x{height} -> {new_width}x{SAFE_PRINT_HEIGHT}")
-        img = img.resize((new_width, SAFE_PRINT_HEIGHT))
+        # Nearest neighbour keeps hard edges on the 1-bit image
+        img = img.resize((new_width, SAFE_PRINT_HEIGHT), Image.Resampling.NEAREST)
         width, height = img.size
 
-    pixels = img.load()
     # Convert PIL pixels (0=Black, 255=White) to Printer bits (1=Black, 0=White)
-    canvas = [[0 for _ in range(width)] for _ in range(height)]
-    for y in range(height):
-        for x in range(width):
-            canvas[y][x] = 0 if pixels[x, y] else 1
+    # Note: img.size is (w, h) but the array is indexed [y, x]
+    arr = np.frombuffer(img.convert("L").tobytes(), dtype=np.uint8)
+    arr = arr.reshape(height, width)
+    canvas = (arr < 128).view(np.uint8)
+
+    # Trim blank columns off the right edge, no need to send them.
+    # Note this also shortens the printed label by the blank right margin.
+    inked_cols = np.flatnonzero(canvas.any(axis=0))
+    last_col = int(inked_cols[-1]) + 1 if inked_cols.size else 0
+    canvas = canvas[:, :last_col]
     return canvas
 
 def generate_full_bands(canvas):
-    width = len(canvas[0])
-    height = len(canvas)
+    height, width = canvas.shape
     # Strictly 5 bands (120 dots)
     num_bands = 5 
-    bands = []
+    full_height = num_bands * BAND_HEIGHT
+
+    # Pad (or crop) the canvas to exactly 5 bands of 24 rows, stored
+    # column-major so each column's vertical pixels are contiguous
+    full = np.zeros((full_height, width), dtype=np.uint8, order="F")
+    rows_avail = min(full_height, height)
+    full[:rows_avail] = canvas[:rows_avail]
+
+    # Pack 24 vertical pixels into 3 bytes per column (MSB = top row)
+    packed = np.packbits(full, axis=0)  # (15, width)
+    packed = packed.reshape(num_bands, BAND_HEIGHT // 8, width)
 
+    # Reorder into the wire format (3 bytes per column) in one preallocated
+    # buffer, then hand out each band as a slice of it
+    columns = np.ascontiguousarray(packed.transpose(0, 2, 1))  # (5, width, 3)
+    rows = columns.reshape(num_bands, 3 * width)
+
+    bands = []
     for band_idx in range(num_bands):
-        start_row = band_idx * BAND_HEIGHT
-        band_data = bytearray()
-        for x in range(width):
-            col_bits = 0
-            # Pack 24 vertical pixels into 3 bytes
-            for bit_offset in range(BAND_HEIGHT):
-                y = start_row + bit_offset
-                if y < height and canvas[y][x]:
-                    col_bits |= (1 << (23 - bit_offset))
-            
-            band_data.extend([
-                (col_bits >> 16) & 0xFF,
-                (col_bits >> 8) & 0xFF,
-                col_bits & 0xFF
-            ])
+        band_data = memoryview(rows[band_idx])
         bands.append((band_data, width))
     return bands
 
@@ -107,6 +142,13 @@ def main():
         )
         
         print(f"Connected to {COM_PORT}")
+
+        # Process the image in the background while the printer initializes
+        pool = ThreadPoolExecutor(max_workers=1)
+        bands_future = pool.submit(
+            lambda: generate_full_bands(load_bitmap_to_canvas(IMG_PATH))
+        )
+        pool.shutdown(wait=False)
         
         # 1. Initialize
         ser.write(b'\x1B\x40')
@@ -124,25 +166,34 @@ def main():
         time.sleep(0.1)
 
         # 3. Process Image
-        canvas = load_bitmap_to_canvas(IMG_PATH)
-        bands = generate_full_bands(canvas)
+        bands = bands_future.result()
         
-        print(f"Printing Label: {len(canvas[0])} dots wide.")
+        width = bands[0][1]
+        if width == 0:
+            print("Image is blank, nothing to print.")
+            return
+        print(f"Printing Label: {width} dots wide.")
+
+        # All bands share the same width, so build the header once
+        # ESC * m(39) n1 n2
+        n1 = width & 0xFF
+        n2 = (width >> 8) & 0xFF
+        header = bytes([0x1B, 0x2A, 39, n1, n2])
 
         # 4. Send Bands (Lines)
-        for i, (band_data, width) in enumerate(bands):
+        for i, (band_data, _) in enumerate(bands):
             print(f"Sending Band {i+1}/5...")
             
-            n1 = width & 0xFF
-            n2 = (width >> 8) & 0xFF
-            
-            # ESC * m(39) n1 n2 [DATA]
-            ser.write(bytearray([0x1B, 0x2A, 39, n1, n2]))
-            safe_send(ser, band_data)
-            
-            # CR LF (Move cursor to start of next band)
-            ser.write(b'\x0D\x0A')    
-            time.sleep(0.1)
+            # [HEADER] [DATA] CR LF (CR LF moves to the next band)
+            packet = header + band_data + b'\x0D\x0A'
+            safe_send(ser, packet)
+            # Only poll the printer when the band could have filled its buffer
+            if len(packet) > 256 and not wait_for_rx_buffer(ser, f"Band {i+1}"):
+                print("Printer error, aborting print.")
+                # Re-initialize to discard the partial raster
+                ser.write(b'\x1B\x40')
+                ser.close()
+                return
 
         print("Triggering Print & Cut...")
         # [FIX 3] CTRL-Z (1A) to Print AND Cut